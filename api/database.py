@@ -1,18 +1,40 @@
 """Database configuration"""
+from contextvars import ContextVar
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./movies.db"
 
+# Taille du pool : au plus MAX_CONNECTIONS connexions ouvertes simultanément par processus.
+POOL_SIZE = 20
+MAX_OVERFLOW = 10
+MAX_CONNECTIONS = POOL_SIZE + MAX_OVERFLOW
+
 # # Créer un moteur de base de données (engine) qui établit la connexion avec notre base SQLite (movies.db).
+# Le pool (un par processus/worker uvicorn) garde les connexions ouvertes pour les réutiliser entre les requêtes.
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=QueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    query_cache_size=1200
 )
 
 # Définir SessionLocal, qui permet de créer des sessions pour interagir avec la base de données.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Définir ScopedSession, un registre qui renvoie la même session pour toute la durée d'une requête.
+# La portée est portée par une ContextVar (et non par le thread) : FastAPI peut exécuter la dépendance
+# et l'endpoint sur des threads différents, mais le contexte de la requête est propagé aux deux.
+request_scope: ContextVar[object] = ContextVar("request_scope", default=None)
+ScopedSession = scoped_session(SessionLocal, scopefunc=request_scope.get)
+
 # Définir Base, qui servira de classe de base pour nos modèles SQLAlchemy.
 Base = declarative_base()
 
@@ -1,9 +1,23 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Path
+import asyncio
+from contextlib import asynccontextmanager
+import os
+import secrets
+import threading
+import anyio
+from cachetools import TTLCache, cached
+import orjson
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Path, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional   
-from database import SessionLocal
+from typing import List, Optional, Tuple   
+import hashlib
+import time
+from database import MAX_CONNECTIONS, ScopedSession, SessionLocal, request_scope
+from responses import MsgspecResponse, ORJSONResponse, PydanticResponse, iter_json_array
 import query_helpers as helpers
 import schemas
+import structs
 
 api_description = """
 ienvenue dans l'API MovieLens
@@ -20,27 +34,122 @@ Elle est idéale pour découvrir comment consommer une API REST avec des donnée
 - Voir des statistiques globales sur la base
 
 Tous les endpoints supportent la pagination (`skip`, `limit`) et des filtres optionnels selon les cas.
+Pour parcourir de grandes listes, préférez la pagination par curseur (`after_id` sur `/movies` et `/links`, `after_user_id` / `after_movie_id` sur `/ratings`) :
+passez la clé du dernier élément reçu pour obtenir la page suivante.
 
 ### Bon à savoir
 - Vous pouvez tester tous les endpoints directement via l'interface Swagger "/docs".
 - Pour toute erreur (ex : ID inexistant), une réponse claire est retournée avec le bon code HTTP.
  """
 
+# --- Taille du threadpool : seuls les appels à la base de données y sont déportés ---
+THREADPOOL_TOKENS = 80
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TOKENS
+    yield
+
+
 # --- Initialisation de l'application FastAPI ---   
 app = FastAPI(
     title="MovieLens API", 
     description=api_description, 
-    version="1.0"
+    version="1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 
 # --- Dépendance pour obtenir une session de base de données ---
-def get_db():
-    db = SessionLocal()
+# La session ne prend une connexion du pool qu'à sa première requête SQL et la rend dès la fin de la réponse.
+async def get_db():
+    request_scope.set(object())
     try:
-        yield db
+        yield ScopedSession()
     finally:
-        db.close()
+        ScopedSession.remove()
+
+
+# --- Dépendance des réponses en flux (/ratings, /tags) ---
+# Une réponse en flux garde sa connexion pendant tout l'envoi et réclame des threads à chaque lot : leur nombre est
+# limité à STREAM_CONNECTIONS pour laisser le reste du pool aux autres requêtes, qui n'attendent donc jamais un client lent.
+STREAM_CONNECTIONS = MAX_CONNECTIONS // 2
+_stream_slots = asyncio.Semaphore(STREAM_CONNECTIONS)
+
+
+async def get_stream_db():
+    async with _stream_slots:
+        request_scope.set(object())
+        try:
+            yield ScopedSession()
+        finally:
+            ScopedSession.remove()
+
+
+# --- Construction des schémas sans revalidation (les données viennent de la base) ---
+def construct(schema, obj):
+    if obj is None:
+        return None
+    return schema.model_construct(**{field: getattr(obj, field) for field in schema.model_fields})
+
+
+# --- Validation HTTP (ETag) des ressources quasi immuables ---
+# L'ETag est une empreinte du corps servi : identique d'un worker et d'un redémarrage à l'autre tant que la donnée ne change pas.
+CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # "*" correspond à toute représentation existante (RFC 9110).
+    if if_none_match.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110) : un ETag renvoyé préfixé par W/ correspond aussi.
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+# --- Cache des lectures unitaires : corps JSON déjà sérialisé (None si la ligne n'existe pas) ---
+# Appelées dans le threadpool, elles n'ouvrent leur propre session que si l'entrée manque : un succès du cache
+# ne touche jamais au pool de connexions. Films et liens sont gardés avec leur ETag.
+# Chaque entrée (y compris une absence) expire après CACHE_TTL secondes.
+CACHE_SIZE = 16384
+CACHE_TTL = 300
+
+
+@cached(TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL), lock=threading.Lock())
+def _movie_json(movie_id: int) -> Optional[Tuple[bytes, str]]:
+    with SessionLocal() as db:
+        movie = helpers.get_movie_json(db, movie_id)
+    if movie is None:
+        return None
+    body = movie.encode("utf-8")
+    return body, make_etag(body)
+
+
+@cached(TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL), lock=threading.Lock())
+def _rating_json(user_id: int, movie_id: int) -> Optional[bytes]:
+    with SessionLocal() as db:
+        rating = helpers.get_rating(db, user_id, movie_id)
+    if rating is None:
+        return None
+    return PydanticResponse(construct(schemas.RatingSimple, rating)).body
+
+
+@cached(TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL), lock=threading.Lock())
+def _link_json(movie_id: int) -> Optional[Tuple[bytes, str]]:
+    with SessionLocal() as db:
+        link = helpers.get_link(db, movie_id=movie_id)
+    if link is None:
+        return None
+    body = PydanticResponse(construct(schemas.LinkSimple, link)).body
+    return body, make_etag(body)
 
 
 # --- Endpoint pour tester la santé de l'API ---
@@ -60,123 +169,136 @@ async def root():
 # Endpoint pour récupérer un film par son ID
 @app.get(
     "/movies/{movie_id}", # /movies/1
-    response_model=schemas.MovieDetailed,
+    responses={200: {"model": schemas.MovieDetailed}},
     tags=["films"],
     summary="Récupère les détails d'un film par son ID",
     description="Récupère les détails d'un film, y compris les évaluations, les tags et les liens associés, en utilisant l'ID du film.",
     response_description="Détails du film, y compris les évaluations, les tags et les liens associés.",
     operation_id="get_movie_by_id"
 )   
-def read_movie(
-    movie_id: int = Path(..., description="L'ID du film à récupérer"), 
-    db: Session = Depends(get_db)
+async def read_movie(
+    request: Request,
+    movie_id: int = Path(..., description="L'ID du film à récupérer")
 ):
-    movie = helpers.get_movie(db, movie_id)
-    if movie is None: 
+    entry = await run_in_threadpool(_movie_json, movie_id)
+    if entry is None: 
         raise HTTPException(status_code=404, detail=f"Film avec l'ID {movie_id} non trouvé") 
-    return movie
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 # Endpoint pour récupérer une liste de films (avec pagination et filtres facultatifs)
 @app.get(
     "/movies", 
-    response_model=List[schemas.MovieSimple], 
+    responses={200: {"model": List[schemas.MovieSimple]}}, 
     tags=["films"], 
     summary="Récupère une liste de films avec pagination et filtres", 
     description="Récupère une liste de films avec des options de pagination et de filtrage par titre et genre.", 
     response_description="Une liste de films correspondant aux critères de recherche.", 
     operation_id="get_movies_list" 
 )
-def list_movies( 
+async def list_movies( 
     skip: int = Query(0, ge=0, description="Nombre de films à ignorer pour la pagination"), 
     limit: int = Query(100, le=1000, description="Nombre maximum de films à retourner"), 
     title: Optional[str] = Query(None, description="Filtrer les films par titre (recherche partielle)"), 
-    genre: Optional[str] = Query(None, description="Filtrer les films par genre (recherche partielle)"), 
+    genre: Optional[str] = Query(None, description="Filtrer les films par genre exact, sans tenir compte de la casse (ex : Action, comedy, Sci-Fi)"), 
+    after_id: Optional[int] = Query(None, description="Pagination par curseur : movieId du dernier film reçu"), 
     db: Session = Depends(get_db) 
 ): 
-    movies = helpers.get_movies(db, skip=skip, limit=limit, title=title, genre=genre)
-    return movies
+    movies = await run_in_threadpool(helpers.get_movies, db, skip=skip, limit=limit, title=title, genre=genre, after_id=after_id)
+    return MsgspecResponse([structs.MovieSimple(*row) for row in movies])
 
 # Endpoint pour obtenir une évaluation par utilisateur et film
 @app.get(
     "/ratings/{user_id}/{movie_id}",
-    response_model=schemas.RatingSimple,
+    responses={200: {"model": schemas.RatingSimple}},
     tags=["évaluations"],
     summary="Récupère une évaluation par utilisateur et film",
     description="Récupère une évaluation spécifique en fonction de l'ID utilisateur et de l'ID du film.",
     response_description="Détails de l'évaluation pour le couple (userId, movieId).",
     operation_id="get_rating_by_user_and_movie"
 )
-def read_rating(
+async def read_rating(
     user_id: int = Path(..., description="L'ID de l'utilisateur"), 
-    movie_id: int = Path(..., description="L'ID du film"), 
-    db: Session = Depends(get_db)
+    movie_id: int = Path(..., description="L'ID du film")
 ):
-    rating = helpers.get_rating(db, user_id, movie_id)
-    if rating is None: 
+    body = await run_in_threadpool(_rating_json, user_id, movie_id)
+    if body is None: 
         raise HTTPException(status_code=404, detail=f"Évaluation pour userId {user_id} et movieId {movie_id} non trouvée") 
-    return rating
+    return Response(body, media_type="application/json")
 
 # Endpoint pour obtenir une liste d'évaluations avec filtres
 @app.get( 
     "/ratings", 
-    response_model=List[schemas.RatingSimple], 
+    responses={200: {"model": List[schemas.RatingSimple]}}, 
     tags=["évaluations"], 
     summary="Récupère une liste d'évaluations avec filtres", 
     description="Récupère une liste d'évaluations avec des options de pagination et de filtrage par ID de film, ID d'utilisateur et note minimale.", 
     response_description="Une liste d'évaluations correspondant aux critères de recherche.", 
     operation_id="get_ratings_list" 
 )
-def list_ratings(
+async def list_ratings(
     skip: int = Query(0, ge=0, description="Nombre d'évaluations à ignorer pour la pagination"), 
     limit: int = Query(100, le=1000, description="Nombre maximum d'évaluations à retourner"), 
     movie_id: Optional[int] = Query(None, description="Filtrer les évaluations par ID de film"), 
     user_id: Optional[int] = Query(None, description="Filtrer les évaluations par ID d'utilisateur"), 
     min_rating: Optional[float] = Query(None, ge=0.0, le=5.0, description="Filtrer les évaluations par note minimale (entre 0.0 et 5.0)"), 
-    db: Session = Depends(get_db) 
+    after_user_id: Optional[int] = Query(None, description="Pagination par curseur : userId de la dernière évaluation reçue"), 
+    after_movie_id: Optional[int] = Query(None, description="Pagination par curseur : movieId de la dernière évaluation reçue (avec after_user_id)"), 
+    db: Session = Depends(get_stream_db) 
 ): 
-    ratings = helpers.get_ratings(db, skip=skip, limit=limit, movie_id=movie_id, user_id=user_id, min_rating=min_rating)
-    return ratings
+    if after_movie_id is not None and after_user_id is None:
+        raise HTTPException(status_code=400, detail="Le paramètre after_movie_id nécessite after_user_id")
+    ratings = await run_in_threadpool(
+        helpers.iter_ratings, db, skip=skip, limit=limit, movie_id=movie_id, user_id=user_id, min_rating=min_rating,
+        after_user_id=after_user_id, after_movie_id=after_movie_id
+    )
+    return StreamingResponse(iter_json_array(ratings, structs.RatingSimple), media_type="application/json")
 
 # Endpoint pour retourner un tag pour un utilisateur et un film donnés, avec le texte du tag
 @app.get(
     "/tags/{user_id}/{movie_id}/{tag_text}",
     summary="Obtenir un tag spécifique",
     description="Retourne un tag pour un utilisateur et un film donnés, avec le texte du tag.",
-    response_model=schemas.TagSimple,
+    responses={200: {"model": schemas.TagSimple}},
     tags=["tags"],
 )
-def read_tag(
+async def read_tag(
     user_id: int = Path(..., description="ID de l'utilisateur"),
     movie_id: int = Path(..., description="ID du film"),
     tag_text: str = Path(..., description="Contenu exact du tag"),
     db: Session = Depends(get_db)
 ):
-    result = helpers.get_tag(db, user_id=user_id, movie_id=movie_id, tag_text=tag_text)
+    result = await run_in_threadpool(helpers.get_tag, db, user_id=user_id, movie_id=movie_id, tag_text=tag_text)
     if result is None:
         raise HTTPException(
             status_code=404,
             detail=f"Tag non trouvé pour l'utilisateur {user_id}, le film {movie_id} et le tag '{tag_text}'"
         )
-    return result
+    return PydanticResponse(construct(schemas.TagSimple, result))
 
 
 # Endpoint pour retourner une liste de tags avec pagination et filtres facultatifs par utilisateur ou film
 @app.get(
     "/tags",
     summary="Lister les tags",
-    description="Retourne une liste de tags avec pagination et filtres facultatifs par utilisateur ou film.",
-    response_model=List[schemas.TagSimple],
+    description="Retourne une liste de tags avec pagination et filtres facultatifs par utilisateur, film ou texte du tag.",
+    responses={200: {"model": List[schemas.TagSimple]}},
     tags=["tags"],
 )
-def list_tags(
+async def list_tags(
     skip: int = Query(0, ge=0, description="Nombre de résultats à ignorer"),
     limit: int = Query(100, le=1000, description="Nombre maximal de résultats à retourner"),
     movie_id: Optional[int] = Query(None, description="Filtrer par ID de film"),
     user_id: Optional[int] = Query(None, description="Filtrer par ID d'utilisateur"),
-    db: Session = Depends(get_db)
+    tag_text: Optional[str] = Query(None, description="Filtrer par texte du tag (recherche partielle)"),
+    db: Session = Depends(get_stream_db)
 ):
-    return helpers.get_tags(db, skip=skip, limit=limit, movie_id=movie_id, user_id=user_id)
+    tags = await run_in_threadpool(helpers.iter_tags, db, skip=skip, limit=limit, movie_id=movie_id, user_id=user_id, tag_text=tag_text)
+    return StreamingResponse(iter_json_array(tags, structs.TagSimple), media_type="application/json")
 
 
 # Endpoint pour retourner les identifiants IMDB et TMDB pour un film donné
@@ -184,20 +306,24 @@ def list_tags(
     "/links/{movie_id}",
     summary="Obtenir le lien d'un film",
     description="Retourne les identifiants IMDB et TMDB pour un film donné.",
-    response_model=schemas.LinkSimple,
+    responses={200: {"model": schemas.LinkSimple}},
     tags=["links"],
 )
-def read_link(
-    movie_id: int = Path(..., description="ID du film"),
-    db: Session = Depends(get_db)
+async def read_link(
+    request: Request,
+    movie_id: int = Path(..., description="ID du film")
 ):
-    result = helpers.get_link(db, movie_id=movie_id)
-    if result is None:
+    entry = await run_in_threadpool(_link_json, movie_id)
+    if entry is None:
         raise HTTPException(
             status_code=404,
             detail=f"Aucun lien trouvé pour le film avec l'ID {movie_id}"
         )
-    return result
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 # Endpoint pour retourner une liste paginée des identifiants IMDB et TMDB de tous les films
@@ -205,15 +331,23 @@ def read_link(
     "/links",
     summary="Lister les liens des films",
     description="Retourne une liste paginée des identifiants IMDB et TMDB de tous les films.",
-    response_model=List[schemas.LinkSimple],
+    responses={200: {"model": List[schemas.LinkSimple]}},
     tags=["links"],
 )
-def list_links(
+async def list_links(
     skip: int = Query(0, ge=0, description="Nombre de résultats à ignorer"),
     limit: int = Query(100, le=1000, description="Nombre maximal de résultats à retourner"),
+    after_id: Optional[int] = Query(None, description="Pagination par curseur : movieId du dernier lien reçu"),
     db: Session = Depends(get_db)
 ):
-    return helpers.get_links(db, skip=skip, limit=limit)
+    links = await run_in_threadpool(helpers.get_links, db, skip=skip, limit=limit, after_id=after_id)
+    return MsgspecResponse([structs.LinkSimple(*row) for row in links])
+
+
+# --- Cache des statistiques (cache-aside) : corps JSON déjà sérialisé, valable ANALYTICS_TTL secondes ---
+# Une entrée (instant, corps) par valeur du paramètre exact.
+ANALYTICS_TTL = 30
+_ANALYTICS_CACHE = {}
 
 
 # Endpoint pour obtenir des statistiques sur la base de données
@@ -227,19 +361,58 @@ def list_links(
     - Nombre total d’évaluations
     - Nombre total de tags
     - Nombre de liens vers IMDB/TMDB
+
+    Par défaut, les nombres sont des **estimations** issues des statistiques de la base (mises à jour par `ANALYZE`).
+    Utilisez `exact=true` pour obtenir les comptages exacts.
     """,
-    response_model=schemas.AnalyticsResponse,
+    responses={200: {"model": schemas.AnalyticsResponse}},
     tags=["analytics"]
 )
-def get_analytics(db: Session = Depends(get_db)):
-    movie_count = helpers.get_movie_count(db)
-    rating_count = helpers.get_rating_count(db)
-    tag_count = helpers.get_tag_count(db)
-    link_count = helpers.get_link_count(db)
-
-    return schemas.AnalyticsResponse(
-        movie_count=movie_count,
-        rating_count=rating_count,
-        tag_count=tag_count,
-        link_count=link_count
-    )
\ No newline at end of file
+async def get_analytics(
+    exact: bool = Query(False, description="Retourner les comptages exacts plutôt que des estimations"),
+    db: Session = Depends(get_db)
+):
+    now = time.monotonic()
+    entry = _ANALYTICS_CACHE.get(exact)
+    if entry is not None and now - entry[0] < ANALYTICS_TTL:
+        return Response(entry[1], media_type="application/json")
+
+    count = helpers.get_counts if exact else helpers.get_estimated_counts
+    movie_count, rating_count, tag_count, link_count = await run_in_threadpool(count, db)
+
+    body = orjson.dumps({
+        "movie_count": movie_count,
+        "rating_count": rating_count,
+        "tag_count": tag_count,
+        "link_count": link_count
+    })
+    _ANALYTICS_CACHE[exact] = (now, body)
+    return Response(body, media_type="application/json")
+
+
+# --- Protection des endpoints d'administration : jeton fourni par la variable d'environnement ADMIN_TOKEN ---
+# Sans ADMIN_TOKEN, les endpoints d'administration sont désactivés.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Accès réservé à l'administration")
+
+
+# Endpoint pour vider les caches en mémoire (à appeler après un rechargement des données)
+# Les caches sont propres à chaque processus : avec plusieurs workers, seul celui qui reçoit la requête est vidé.
+@app.post(
+    "/admin/cache/clear",
+    summary="Vider les caches",
+    description="Vide les caches en mémoire des films, évaluations, liens et statistiques du worker qui reçoit la requête. Nécessite l'en-tête X-Admin-Token.",
+    tags=["admin"],
+    include_in_schema=False,
+    dependencies=[Depends(require_admin)]
+)
+async def clear_cache():
+    _movie_json.cache_clear()
+    _rating_json.cache_clear()
+    _link_json.cache_clear()
+    _ANALYTICS_CACHE.clear()
+    return {"message": "Caches vidés"}
@@ -0,0 +1,97 @@
+"""Migrations ponctuelles de la base de données"""
+from sqlalchemy import delete, insert, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+from database import engine
+from models import Movie, MovieGenre, Tag
+
+
+def create_movie_genres(engine):
+    """Crée et remplit la table movie_genres à partir de la colonne movies.genres (genres stockés en minuscules)."""
+    MovieGenre.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        movies = conn.execute(select(Movie.movieId, Movie.genres)).all()
+        rows = [
+            {"movieId": movie_id, "genre": genre}
+            for movie_id, genres in movies if genres
+            for genre in {genre.lower() for genre in genres.split("|") if genre}
+        ]
+        conn.execute(delete(MovieGenre))
+        conn.execute(insert(MovieGenre), rows)
+    return len(rows)
+
+
+# Triggers (syntaxe SQLite) qui maintiennent movies.rating_count / movies.rating_sum à chaque écriture dans ratings.
+RATING_COUNTER_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS ratings_counters_insert AFTER INSERT ON ratings
+    BEGIN
+        UPDATE movies SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+        WHERE movieId = NEW.movieId;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ratings_counters_delete AFTER DELETE ON ratings
+    BEGIN
+        UPDATE movies SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+        WHERE movieId = OLD.movieId;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ratings_counters_update AFTER UPDATE OF movieId, rating ON ratings
+    BEGIN
+        UPDATE movies SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+        WHERE movieId = OLD.movieId;
+        UPDATE movies SET rating_count = rating_count + 1, rating_sum = rating_sum + NEW.rating
+        WHERE movieId = NEW.movieId;
+    END
+    """,
+]
+
+
+def add_rating_counters(engine):
+    """Ajoute et remplit movies.rating_count / movies.rating_sum, puis crée les triggers qui les maintiennent."""
+    columns = {column["name"] for column in inspect(engine).get_columns("movies")}
+    with engine.begin() as conn:
+        if "rating_count" not in columns:
+            conn.execute(text("ALTER TABLE movies ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0"))
+        if "rating_sum" not in columns:
+            conn.execute(text("ALTER TABLE movies ADD COLUMN rating_sum FLOAT NOT NULL DEFAULT 0"))
+        conn.execute(text("""
+            UPDATE movies SET
+                rating_count = (SELECT COUNT(*) FROM ratings r WHERE r.movieId = movies.movieId),
+                rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM ratings r WHERE r.movieId = movies.movieId)
+        """))
+        for trigger in RATING_COUNTER_TRIGGERS:
+            conn.execute(text(trigger))
+
+
+# Index trigrammes déclarés dans models.py (movies.title, tags.tag), créés uniquement sous PostgreSQL.
+TRIGRAM_INDEXES = [index for table in (Movie.__table__, Tag.__table__) for index in table.indexes if index.name.endswith("_trgm")]
+
+
+def create_trigram_indexes(engine):
+    """Crée l'extension pg_trgm et les index trigrammes des recherches partielles (PostgreSQL uniquement)."""
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for index in TRIGRAM_INDEXES:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+    return True
+
+
+def analyze(engine):
+    """Met à jour les statistiques du planificateur (utilisées aussi par les estimations de /analytics)."""
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+if __name__ == "__main__":
+    print(f"movie_genres : {create_movie_genres(engine)} lignes")
+    add_rating_counters(engine)
+    print("Compteurs d'évaluations des films à jour")
+    if create_trigram_indexes(engine):
+        print("Index trigrammes créés (pg_trgm)")
+    analyze(engine)
+    print("Statistiques mises à jour (ANALYZE)")
@@ -1,20 +1,48 @@
 """SQLAlchemy models"""
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship # permet des relations de clé étrangère entre les tables.
 from database import Base
 
+# Index trigrammes (PostgreSQL uniquement) pour les recherches partielles ILIKE '%...%'.
+# Sous SQLite ces index ne sont pas créés : un LIKE avec joker initial y reste un parcours de table.
+# Sur une base existante, ils sont créés par migrations.py (create_trigram_indexes).
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class Movie(Base):
     __tablename__ = "movies"
 
     movieId = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     genres = Column(String)
+    # Compteurs dénormalisés, maintenus par les triggers de la table ratings (voir migrations.py)
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Float, nullable=False, default=0.0, server_default="0")
 
     ratings = relationship("Rating", back_populates="movie", cascade="all, delete")
     tags = relationship("Tag", back_populates="movie", cascade="all, delete")
     link = relationship("Link", back_populates="movie", uselist=False, cascade="all, delete")
 
+    __table_args__ = (
+        Index("movies_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
+
     
+class MovieGenre(Base):
+    """Un genre d'un film : forme normalisée de la colonne movies.genres (valeurs séparées par des |), en minuscules."""
+    __tablename__ = "movie_genres"
+
+    movieId = Column(Integer, ForeignKey("movies.movieId"), primary_key=True)
+    genre = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_movie_genres_genre_movieId", "genre", "movieId"),
+    )
+
+
 class Rating(Base):
     __tablename__ = "ratings"
 
@@ -36,6 +64,10 @@ class Tag(Base):
 
     movie = relationship("Movie", back_populates="tags")
 
+    __table_args__ = (
+        Index("tags_tag_trgm", "tag", postgresql_using="gin", postgresql_ops={"tag": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
+
 
 class Link(Base):
     __tablename__ = "links"
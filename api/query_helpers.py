@@ -1,6 +1,7 @@
 """SQLAlchemy Query Functions for MovieLens API"""
+from functools import lru_cache
+from sqlalchemy import bindparam, func, select, text, tuple_
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import joinedload
 from typing import Optional
 
 import models
@@ -10,51 +11,169 @@ def get_movie(db: Session, movie_id: int):
     """Récupère un film par son ID."""
     return db.query(models.Movie).filter(models.Movie.movieId == movie_id).first()
 
-def get_movies(db: Session, skip: int = 0, limit: int = 100, title: str = None, genre: str = None):
-    """Récupère une liste de films avec filtres optionnels."""
-    query = db.query(models.Movie)
-    
+# Détail d'un film assemblé directement en JSON par la base (fonctions JSON1 de SQLite), en une seule requête.
+# json() conserve les sous-requêtes comme JSON imbriqué (et non comme chaînes) ; json(NULL) donne null.
+MOVIE_DETAILED_JSON = text("""
+    SELECT json_object(
+        'movieId', m.movieId,
+        'title', m.title,
+        'genres', m.genres,
+        'rating_count', m.rating_count,
+        'average_rating', CASE WHEN m.rating_count > 0 THEN m.rating_sum / m.rating_count END,
+        'ratings', json((
+            SELECT json_group_array(json_object(
+                'userId', r.userId, 'movieId', r.movieId, 'rating', r.rating, 'timestamp', r.timestamp
+            ))
+            FROM ratings r WHERE r.movieId = m.movieId
+        )),
+        'tags', json((
+            SELECT json_group_array(json_object(
+                'userId', t.userId, 'movieId', t.movieId, 'tag', t.tag, 'timestamp', t.timestamp
+            ))
+            FROM tags t WHERE t.movieId = m.movieId
+        )),
+        'link', json((
+            SELECT json_object('imdbId', l.imdbId, 'tmdbId', l.tmdbId)
+            FROM links l WHERE l.movieId = m.movieId
+        ))
+    )
+    FROM movies m
+    WHERE m.movieId = :movie_id
+""")
+
+def get_movie_json(db: Session, movie_id: int):
+    """Retourne le détail d'un film (évaluations, tags, lien) sous forme de document JSON, ou None."""
+    return db.execute(MOVIE_DETAILED_JSON, {"movie_id": movie_id}).scalar_one_or_none()
+
+# Taille des lots lus par les parcours en flux (iter_ratings, iter_tags)
+STREAM_BATCH_SIZE = 500
+
+# --- Requêtes préconstruites ---
+# Chaque combinaison de filtres donne une requête construite une seule fois, paramétrée par bindparam :
+# les valeurs ne font pas partie de la clé de cache, la requête compilée est donc réutilisée d'un appel à l'autre.
+
+@lru_cache(maxsize=None)
+def _movies_stmt(title: bool, genre: bool, after_id: bool):
+    stmt = select(models.Movie.movieId, models.Movie.title, models.Movie.genres)
+    # Avec un filtre de genre, tri et curseur portent sur movie_genres.movieId pour suivre l'index (genre, movieId).
+    # Les genres y sont stockés en minuscules : la valeur recherchée est normalisée de la même façon (voir get_movies).
+    key = models.Movie.movieId
+
     if title:
-        query = query.filter(models.Movie.title.ilike(f"%{title}%"))
+        stmt = stmt.where(models.Movie.title.ilike(bindparam("title")))
     if genre:
-        query = query.filter(models.Movie.genres.ilike(f"%{genre}%"))
-    
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.join(models.MovieGenre, models.MovieGenre.movieId == models.Movie.movieId).where(models.MovieGenre.genre == bindparam("genre"))
+        key = models.MovieGenre.movieId
+    if after_id:
+        stmt = stmt.where(key > bindparam("after_id"))
 
-# --- Évaluations ---
-def get_rating(db: Session, user_id: int, movie_id: int):
-    """Récupère une évaluation en fonction du couple (userId, movieId)."""
-    return db.query(models.Rating).filter(
-        models.Rating.userId == user_id,
-        models.Rating.movieId == movie_id
-    ).first()
+    return stmt.order_by(key).offset(bindparam("skip")).limit(bindparam("limit"))
 
+@lru_cache(maxsize=None)
+def _ratings_stmt(movie_id: bool, user_id: bool, min_rating: bool, after_user_id: bool, after_movie_id: bool):
+    stmt = select(models.Rating.userId, models.Rating.movieId, models.Rating.rating, models.Rating.timestamp)
 
-def get_ratings(db: Session, skip: int = 0, limit: int = 100, movie_id: int = None, user_id: int = None, min_rating: float = None):
-    """Récupère une liste d'évaluations avec filtres optionnels."""
-    query = db.query(models.Rating)
-    
     if movie_id:
-        query = query.filter(models.Rating.movieId == movie_id)
+        stmt = stmt.where(models.Rating.movieId == bindparam("movie_id"))
     if user_id:
-        query = query.filter(models.Rating.userId == user_id)
+        stmt = stmt.where(models.Rating.userId == bindparam("user_id"))
     if min_rating:
-        query = query.filter(models.Rating.rating >= min_rating)
-    
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.Rating.rating >= bindparam("min_rating"))
+    if after_user_id and after_movie_id:
+        stmt = stmt.where(
+            tuple_(models.Rating.userId, models.Rating.movieId) > tuple_(bindparam("after_user_id"), bindparam("after_movie_id"))
+        )
+    elif after_user_id:
+        stmt = stmt.where(models.Rating.userId > bindparam("after_user_id"))
+
+    return stmt.order_by(models.Rating.userId, models.Rating.movieId).offset(bindparam("skip")).limit(bindparam("limit"))
+
+@lru_cache(maxsize=None)
+def _tags_stmt(movie_id: bool, user_id: bool, tag_text: bool):
+    stmt = select(models.Tag.userId, models.Tag.movieId, models.Tag.tag, models.Tag.timestamp)
+
+    if movie_id:
+        stmt = stmt.where(models.Tag.movieId == bindparam("movie_id"))
+    if user_id:
+        stmt = stmt.where(models.Tag.userId == bindparam("user_id"))
+    if tag_text:
+        stmt = stmt.where(models.Tag.tag.ilike(bindparam("tag_text")))
+
+    return stmt.offset(bindparam("skip")).limit(bindparam("limit"))
+
+@lru_cache(maxsize=None)
+def _links_stmt(after_id: bool):
+    stmt = select(models.Link.movieId, models.Link.imdbId, models.Link.tmdbId)
+    if after_id:
+        stmt = stmt.where(models.Link.movieId > bindparam("after_id"))
+
+    return stmt.order_by(models.Link.movieId).offset(bindparam("skip")).limit(bindparam("limit"))
+
+RATING_STMT = select(models.Rating.userId, models.Rating.movieId, models.Rating.rating, models.Rating.timestamp).where(
+    models.Rating.userId == bindparam("user_id"),
+    models.Rating.movieId == bindparam("movie_id")
+)
+
+TAG_STMT = select(models.Tag.userId, models.Tag.movieId, models.Tag.tag, models.Tag.timestamp).where(
+    models.Tag.userId == bindparam("user_id"),
+    models.Tag.movieId == bindparam("movie_id"),
+    models.Tag.tag == bindparam("tag_text")
+)
+
+LINK_STMT = select(models.Link.movieId, models.Link.imdbId, models.Link.tmdbId).where(
+    models.Link.movieId == bindparam("movie_id")
+)
+
+def get_movies(db: Session, skip: int = 0, limit: int = 100, title: str = None, genre: str = None, after_id: int = None):
+    """Récupère une liste de films (movieId, title, genres) triés par movieId, avec filtres optionnels.
+
+    `genre` est comparé sans tenir compte de la casse.
+    `after_id` active la pagination par curseur : seuls les films d'ID strictement supérieur sont retournés.
+    """
+    stmt = _movies_stmt(bool(title), bool(genre), after_id is not None)
+    params = {"title": f"%{title}%", "genre": genre.lower() if genre else None, "after_id": after_id, "skip": skip, "limit": limit}
+    return db.execute(stmt, params).all()
+
+# --- Évaluations ---
+def get_rating(db: Session, user_id: int, movie_id: int):
+    """Récupère une évaluation (userId, movieId, rating, timestamp) en fonction du couple (userId, movieId)."""
+    return db.execute(RATING_STMT, {"user_id": user_id, "movie_id": movie_id}).first()
+
+
+def get_ratings(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100, 
+    movie_id: int = None, 
+    user_id: int = None, 
+    min_rating: float = None, 
+    after_user_id: int = None, 
+    after_movie_id: int = None
+):
+    """Récupère une liste d'évaluations (userId, movieId, rating, timestamp) triées par (userId, movieId), avec filtres optionnels.
+
+    `after_user_id` / `after_movie_id` activent la pagination par curseur à partir de la dernière évaluation reçue.
+    """
+    stmt, params = _ratings_query(skip, limit, movie_id, user_id, min_rating, after_user_id, after_movie_id)
+    return db.execute(stmt, params).all()
+
+def iter_ratings(db: Session, batch_size: int = STREAM_BATCH_SIZE, **filters):
+    """Comme get_ratings (mêmes filtres), mais parcourt le résultat par lots de `batch_size` lignes (yield_per)."""
+    stmt, params = _ratings_query(**filters)
+    return db.execute(stmt, params, execution_options={"yield_per": batch_size}).partitions()
+
+def _ratings_query(skip=0, limit=100, movie_id=None, user_id=None, min_rating=None, after_user_id=None, after_movie_id=None):
+    stmt = _ratings_stmt(bool(movie_id), bool(user_id), bool(min_rating), after_user_id is not None, after_movie_id is not None)
+    params = {
+        "movie_id": movie_id, "user_id": user_id, "min_rating": min_rating,
+        "after_user_id": after_user_id, "after_movie_id": after_movie_id, "skip": skip, "limit": limit
+    }
+    return stmt, params
 
 # --- Tags ---
 def get_tag(db: Session, user_id: int, movie_id: int, tag_text: str):
-    """Récupère un tag par userId, movieId et le texte du tag."""
-    return (
-        db.query(models.Tag)
-        .filter(
-            models.Tag.userId == user_id,
-            models.Tag.movieId == movie_id,
-            models.Tag.tag == tag_text
-        )
-        .first()
-    )
+    """Récupère un tag (userId, movieId, tag, timestamp) par userId, movieId et le texte du tag."""
+    return db.execute(TAG_STMT, {"user_id": user_id, "movie_id": movie_id, "tag_text": tag_text}).first()
 
 
 def get_tags(
@@ -62,27 +181,35 @@ def get_tags(
     skip: int = 0, 
     limit: int = 100, 
     movie_id: Optional[int] = None, 
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    tag_text: Optional[str] = None
 ):
-    """Récupère une liste de tags avec filtres optionnels."""
-    query = db.query(models.Tag)
+    """Récupère une liste de tags (userId, movieId, tag, timestamp) avec filtres optionnels."""
+    stmt, params = _tags_query(skip, limit, movie_id, user_id, tag_text)
+    return db.execute(stmt, params).all()
 
-    if movie_id is not None:
-        query = query.filter(models.Tag.movieId == movie_id)
-    if user_id is not None:
-        query = query.filter(models.Tag.userId == user_id)
+def iter_tags(db: Session, batch_size: int = STREAM_BATCH_SIZE, **filters):
+    """Comme get_tags (mêmes filtres), mais parcourt le résultat par lots de `batch_size` lignes (yield_per)."""
+    stmt, params = _tags_query(**filters)
+    return db.execute(stmt, params, execution_options={"yield_per": batch_size}).partitions()
 
-    return query.offset(skip).limit(limit).all()
+def _tags_query(skip=0, limit=100, movie_id=None, user_id=None, tag_text=None):
+    stmt = _tags_stmt(movie_id is not None, user_id is not None, bool(tag_text))
+    params = {"movie_id": movie_id, "user_id": user_id, "tag_text": f"%{tag_text}%", "skip": skip, "limit": limit}
+    return stmt, params
 
 
 # --- Liens ---
 def get_link(db: Session, movie_id: int):
-    """Retourne le lien IMDB et TMDB associé à un film spécifique."""
-    return db.query(models.Link).filter(models.Link.movieId == movie_id).first()
+    """Retourne le lien (movieId, imdbId, tmdbId) associé à un film spécifique."""
+    return db.execute(LINK_STMT, {"movie_id": movie_id}).first()
+
+def get_links(db: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    """Retourne une liste paginée de liens (movieId, imdbId, tmdbId) de films, triés par movieId.
 
-def get_links(db: Session, skip: int = 0, limit: int = 100):
-    """Retourne une liste paginée de liens IMDB et TMDB de films."""
-    return db.query(models.Link).offset(skip).limit(limit).all()
+    `after_id` active la pagination par curseur : seuls les liens de movieId strictement supérieur sont retournés.
+    """
+    return db.execute(_links_stmt(after_id is not None), {"after_id": after_id, "skip": skip, "limit": limit}).all()
 
 # --- Requêtes analytiques ---
 def get_movie_count(db: Session):
@@ -99,4 +226,46 @@ def get_tag_count(db: Session):
 
 def get_link_count(db: Session):
     """Retourne le nombre total de liens."""
-    return db.query(models.Link).count()
\ No newline at end of file
+    return db.query(models.Link).count()
+
+def get_counts(db: Session):
+    """Retourne en une seule requête le nombre de films, d'évaluations, de tags et de liens."""
+    return db.execute(
+        select(
+            select(func.count()).select_from(models.Movie).scalar_subquery(),
+            select(func.count()).select_from(models.Rating).scalar_subquery(),
+            select(func.count()).select_from(models.Tag).scalar_subquery(),
+            select(func.count()).select_from(models.Link).scalar_subquery()
+        )
+    ).one()
+
+# Estimations lues dans les statistiques du planificateur (pg_class.reltuples sous PostgreSQL,
+# sqlite_stat1 sous SQLite, alimentées par ANALYZE) : aucune table n'est parcourue.
+COUNT_TABLES = ("movies", "ratings", "tags", "links")
+
+PG_ESTIMATES = text("SELECT relname, reltuples::bigint FROM pg_class WHERE relname IN :tables").bindparams(
+    bindparam("tables", expanding=True)
+)
+
+SQLITE_ESTIMATES = text("""
+    SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl IN :tables GROUP BY tbl
+""").bindparams(bindparam("tables", expanding=True))
+
+SQLITE_HAS_STATS = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+
+def get_estimated_counts(db: Session):
+    """Retourne une estimation du nombre de films, d'évaluations, de tags et de liens.
+
+    Se replie sur get_counts() si les statistiques manquent (base jamais analysée ou moteur non géré).
+    """
+    dialect = db.get_bind().dialect.name
+    estimates = {}
+    if dialect == "postgresql":
+        estimates = dict(db.execute(PG_ESTIMATES, {"tables": COUNT_TABLES}).all())
+    elif dialect == "sqlite" and db.execute(SQLITE_HAS_STATS).first() is not None:
+        estimates = dict(db.execute(SQLITE_ESTIMATES, {"tables": COUNT_TABLES}).all())
+
+    # reltuples vaut -1 sous PostgreSQL pour une table jamais analysée
+    if any(estimates.get(table) is None or estimates[table] < 0 for table in COUNT_TABLES):
+        return get_counts(db)
+    return tuple(estimates[table] for table in COUNT_TABLES)
\ No newline at end of file
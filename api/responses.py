@@ -0,0 +1,44 @@
+"""Custom response classes for MovieLens API"""
+from typing import Any, Iterable, Iterator
+
+import msgspec
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Encodeurs créés une seule fois à l'import et réutilisés par toutes les réponses.
+_dumps = orjson.dumps
+_OPTS = orjson.OPT_NON_STR_KEYS
+ENC = msgspec.json.Encoder()
+
+
+class ORJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée avec orjson, sans passer par jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return _dumps(content, default=str, option=_OPTS)
+
+
+class PydanticResponse(JSONResponse):
+    """Réponse rendue directement par le sérialiseur (déjà compilé) du modèle Pydantic."""
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content, by_alias=True)
+
+
+class MsgspecResponse(JSONResponse):
+    """Réponse encodée avec msgspec à partir de Structs."""
+
+    def render(self, content: Any) -> bytes:
+        return ENC.encode(content)
+
+
+def iter_json_array(partitions: Iterable[Iterable[tuple]], struct: type) -> Iterator[bytes]:
+    """Encode des lots de lignes en un tableau JSON, un morceau par lot (pour StreamingResponse)."""
+    yield b"["
+    first = True
+    for rows in partitions:
+        chunk = ENC.encode([struct(*row) for row in rows])[1:-1]
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
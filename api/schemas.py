@@ -43,6 +43,8 @@ class MovieBase(BaseModel):
 
 
 class MovieDetailed(MovieBase):
+    rating_count: int = 0
+    average_rating: Optional[float] = None
     ratings: List[RatingBase] = []
     tags: List[TagBase] = []
     link: Optional[LinkBase] = None
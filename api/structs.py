@@ -0,0 +1,30 @@
+"""msgspec Structs mirroring the list schemas"""
+from typing import Optional
+
+import msgspec
+
+
+class MovieSimple(msgspec.Struct):
+    movieId: int
+    title: str
+    genres: Optional[str]
+
+
+class RatingSimple(msgspec.Struct):
+    userId: int
+    movieId: int
+    rating: float
+    timestamp: int
+
+
+class TagSimple(msgspec.Struct):
+    userId: int
+    movieId: int
+    tag: str
+    timestamp: int
+
+
+class LinkSimple(msgspec.Struct):
+    movieId: int
+    imdbId: Optional[str]
+    tmdbId: Optional[int]
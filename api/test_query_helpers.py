@@ -1,15 +1,17 @@
 from database import SessionLocal
-from api import query_helpers as query_helpers
+import query_helpers
 
 
-db = SessionLocal()
+def main():
+    db = SessionLocal()
 
-movies = query_helpers.get_movies(db, title="Inception", genre="Sci-Fi", limit=5)
+    movies = query_helpers.get_movies(db, title="Inception", genre="Sci-Fi", limit=5)
 
-for movie in movies:
-    print(f"Movie ID: {movie.movieId}, Title: {movie.title}, Genres: {movie.genres}")   
+    for movie in movies:
+        print(f"Movie ID: {movie.movieId}, Title: {movie.title}, Genres: {movie.genres}")   
 
+    db.close()
 
 
-db.close()
-
+if __name__ == "__main__":
+    main()